@@ -1,8 +1,16 @@
+import functools
 import io
+import multiprocessing
 import os
+import queue
+import shutil
+import subprocess
 import sys
+import tempfile
 import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -10,6 +18,64 @@ import fitz
 from PIL import Image
 from PySide6 import QtCore, QtGui, QtWidgets
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from turbojpeg import (
+        TJCS_CMYK,
+        TJCS_GRAY,
+        TJCS_YCCK,
+        TJFLAG_PROGRESSIVE,
+        TJPF_GRAY,
+        TJPF_RGB,
+        TJSAMP_420,
+        TJSAMP_GRAY,
+        TurboJPEG,
+    )
+
+    _TJ = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _TJ = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+_CJPEGLI = shutil.which("cjpegli")
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+if njit is not None:
+
+    @njit(cache=not getattr(sys, "frozen", False), nogil=True)
+    def _fs_dither_to_l(src, dst):
+        height, width = src.shape
+        current = np.zeros(width + 2, np.float32)
+        following = np.zeros(width + 2, np.float32)
+        for y in range(height):
+            for x in range(width):
+                value = src[y, x] + current[x + 1]
+                level = 255 if value >= 128 else 0
+                dst[y, x] = level
+                error = value - level
+                current[x + 2] += error * 7 / 16
+                following[x] += error * 3 / 16
+                following[x + 1] += error * 5 / 16
+                following[x + 2] += error / 16
+            current[:] = following
+            following[:] = 0
+else:
+    _fs_dither_to_l = None
+
 
 APP_TITLE = "PDF Scan Compressor"
 
@@ -19,6 +85,9 @@ class CompressionSettings:
     dpi: int
     color_mode: str
     jpeg_quality: int
+    jpeg_encoder: str
+    progressive_jpeg: bool
+    resize_backend: str
     skip_pages_without_images: bool
     skip_small_images: bool
     output_dir: str | None
@@ -74,26 +143,105 @@ class FileTable(QtWidgets.QTableWidget):
         event.acceptProposedAction()
 
 
-class CompressionWorker(QtCore.QObject):
-    progress_overall = QtCore.Signal(int)
-    progress_file = QtCore.Signal(int)
-    log = QtCore.Signal(str)
-    file_started = QtCore.Signal(int)
-    file_finished = QtCore.Signal(int, str, int, int, str)
-    finished = QtCore.Signal()
+_events = None
+_stop_event = None
+_page_workers = 1
+_write_queue = None
 
-    def __init__(self, files, settings: CompressionSettings):
-        super().__init__()
-        self.files = files
-        self.settings = settings
-        self._stop_event = threading.Event()
 
-    def stop(self):
-        self._stop_event.set()
+def _writer_loop(write_queue):
+    while True:
+        index, file_path, write = write_queue.get()
+        try:
+            write()
+        except Exception as exc:
+            timestamp = time.strftime("%H:%M:%S")
+            _events.put(("log", f"[{timestamp}] Ошибка: {file_path} — {exc}"))
+            _events.put(("file_finished", index, "Error", 0, 0, "-"))
+
+
+def _init_process(events, stop_event, page_workers):
+    global _events, _stop_event, _page_workers, _write_queue
+    _events = events
+    _stop_event = stop_event
+    _page_workers = page_workers
+    _write_queue = queue.Queue(maxsize=2)
+    threading.Thread(target=_writer_loop, args=(_write_queue,), daemon=True).start()
+
+
+def _resolve_jpeg_encoder(encoder: str) -> str:
+    if encoder == "jpegli" and _CJPEGLI is None:
+        encoder = "turbojpeg"
+    if encoder == "turbojpeg" and _TJ is None:
+        encoder = "pillow"
+    return encoder
+
+
+def _resolve_resize_backend(backend: str) -> str:
+    if backend == "opencv" and cv2 is None:
+        backend = "pillow"
+    return backend
+
+
+def _process_one_file(index: int, file_path: str, settings: CompressionSettings):
+    compressor = PdfCompressor(settings, _events, _stop_event, _page_workers, _write_queue)
+    return compressor.compress(index, file_path)
+
+
+class PdfCompressor:
+    def __init__(
+        self,
+        settings: CompressionSettings,
+        events,
+        stop_event,
+        page_workers: int = 1,
+        write_queue=None,
+    ):
+        self.settings = settings
+        self._events = events
+        self._stop_event = stop_event
+        self._page_workers = page_workers
+        self._write_queue = write_queue
+        self._last_emit_time = 0.0
+        self._last_emit_pct = -1
+        self._pending_logs = []
+        self._log_lock = threading.Lock()
+        self._buffers = threading.local()
+        self._jpeg_encoder = _resolve_jpeg_encoder(settings.jpeg_encoder)
+        self._resize_backend = _resolve_resize_backend(settings.resize_backend)
+        self._raw_extractors = {"DCTDecode": self._extract_dct}
+        self._seen_xrefs = set()
+
+    def _emit(self, signal, *args):
+        self._flush_logs()
+        self._events.put((signal, *args))
+
+    def _flush_logs(self):
+        with self._log_lock:
+            messages, self._pending_logs = self._pending_logs, []
+        if messages:
+            self._events.put(("log", "\n".join(messages)))
 
     def _log(self, message):
         timestamp = time.strftime("%H:%M:%S")
-        self.log.emit(f"[{timestamp}] {message}")
+        with self._log_lock:
+            self._pending_logs.append(f"[{timestamp}] {message}")
+            if len(self._pending_logs) < 50:
+                return
+        self._flush_logs()
+
+    def _emit_progress(self, index: int, progress: int, force: bool = False):
+        now = time.monotonic()
+        if not force and (now - self._last_emit_time < 0.05 or progress == self._last_emit_pct):
+            return
+        self._last_emit_time = now
+        self._last_emit_pct = progress
+        self._emit("file_progress", index, progress)
+
+    def _stopped(self, index: int, file_path: str):
+        self._emit("file_finished", index, "Остановлено", 0, 0, "-")
+        self._log(f"Остановлено: {file_path}")
+        return None
 
     def _determine_output_path(self, input_path: str) -> Path:
         source = Path(input_path)
@@ -107,95 +255,387 @@ class CompressionWorker(QtCore.QObject):
 
     def _colorize(self, image: Image.Image) -> Image.Image:
         if self.settings.color_mode == "Color":
-            return image.convert("RGB")
+            return image if image.mode == "RGB" else image.convert("RGB")
+        if image.mode != "L":
+            image = image.convert("L")
         if self.settings.color_mode == "Grayscale":
-            return image.convert("L")
-        return image.convert("L").convert("1").convert("L")
+            return image
+        if _fs_dither_to_l is not None:
+            array = np.asarray(image)
+            dithered = np.empty_like(array)
+            _fs_dither_to_l(array, dithered)
+            return Image.fromarray(dithered, "L")
+        return image.convert("1").convert("L")
 
     def _downscale(self, image: Image.Image, target_width: int, target_height: int) -> Image.Image:
         width, height = image.size
         if width <= target_width and height <= target_height:
             return image
+        if self._resize_backend == "opencv":
+            interpolation = cv2.INTER_AREA if width >= 2 * target_width else cv2.INTER_LANCZOS4
+            resized = cv2.resize(np.asarray(image), (target_width, target_height), interpolation=interpolation)
+            return Image.fromarray(resized, image.mode)
         return image.resize((target_width, target_height), Image.LANCZOS)
 
-    def _process_page_images(self, doc: fitz.Document, page: fitz.Page):
+    def _encode_jpegli(self, image: Image.Image) -> bytes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = Path(temp_dir) / ("image.pgm" if image.mode == "L" else "image.ppm")
+            target = Path(temp_dir) / "image.jpg"
+            image.save(source, format="PPM")
+            progressive_level = 2 if self.settings.progressive_jpeg else 0
+            subprocess.run(
+                [
+                    _CJPEGLI,
+                    str(source),
+                    str(target),
+                    "-q",
+                    str(self.settings.jpeg_quality),
+                    f"--progressive_level={progressive_level}",
+                ],
+                check=True,
+                capture_output=True,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+            return target.read_bytes()
+
+    def _encode_buffer(self) -> io.BytesIO:
+        buffer = getattr(self._buffers, "jpeg", None)
+        if buffer is None:
+            buffer = self._buffers.jpeg = io.BytesIO()
+        buffer.seek(0)
+        return buffer
+
+    def _encode_pixmap(self, image: Image.Image) -> bytes:
+        colorspace = fitz.csGRAY if image.mode == "L" else fitz.csRGB
+        pixmap = fitz.Pixmap(colorspace, image.width, image.height, image.tobytes(), False)
+        return pixmap.tobytes("jpeg", jpg_quality=self.settings.jpeg_quality)
+
+    def _encode_jpeg(self, image: Image.Image) -> bytes:
+        if self._jpeg_encoder == "jpegli":
+            return self._encode_jpegli(image)
+        if self._jpeg_encoder == "turbojpeg":
+            if image.mode == "L":
+                pixel_format, subsample = TJPF_GRAY, TJSAMP_GRAY
+            else:
+                pixel_format, subsample = TJPF_RGB, TJSAMP_420
+            return _TJ.encode(
+                np.asarray(image),
+                quality=self.settings.jpeg_quality,
+                pixel_format=pixel_format,
+                jpeg_subsample=subsample,
+                flags=TJFLAG_PROGRESSIVE if self.settings.progressive_jpeg else 0,
+            )
+        buffer = self._encode_buffer()
+        image.save(
+            buffer,
+            format="JPEG",
+            quality=self.settings.jpeg_quality,
+            optimize=True,
+            progressive=self.settings.progressive_jpeg,
+        )
+        size = buffer.tell()
+        with buffer.getbuffer() as view:
+            return view[:size].tobytes()
+
+    def _keeps_original(self, base: dict, target_width: int, target_height: int) -> bool:
+        if base.get("ext") not in ("jpeg", "jpg"):
+            return False
+        width, height = base.get("width", 0), base.get("height", 0)
+        if width > target_width or height > target_height:
+            return False
+        channels = {"Color": 3, "Grayscale": 1}.get(self.settings.color_mode)
+        if base.get("colorspace") != channels:
+            return False
+        if len(base["image"]) < 0.12 * width * height * channels:
+            return True
+        return channels == 1
+
+    def _extract_dct(self, doc: fitz.Document, image_info) -> dict | None:
+        if _TJ is None:
+            return None
+        image_bytes = doc.xref_stream_raw(image_info[0])
+        _, _, _, jpeg_colorspace = _TJ.decode_header(image_bytes)
+        if jpeg_colorspace in (TJCS_CMYK, TJCS_YCCK):
+            return None
+        return {
+            "image": image_bytes,
+            "ext": "jpeg",
+            "width": image_info[2],
+            "height": image_info[3],
+            "colorspace": 1 if jpeg_colorspace == TJCS_GRAY else 3,
+        }
+
+    def _collect_page_images(self, doc: fitz.Document, page: fitz.Page):
         images = page.get_images(full=True)
         if not images and self.settings.skip_pages_without_images:
-            return
+            return []
+        dpi = self.settings.dpi
+        skip_small = self.settings.skip_small_images
+        page_rect = page.rect
+        target_width = max(1, int(page_rect.width / 72 * dpi))
+        target_height = max(1, int(page_rect.height / 72 * dpi))
+        jobs = []
         for image_info in images:
             xref = image_info[0]
+            if xref in self._seen_xrefs:
+                continue
+            self._seen_xrefs.add(xref)
+            if skip_small and image_info[2] < 1000:
+                continue
             try:
-                base = doc.extract_image(xref)
-                image_bytes = base.get("image")
-                if not image_bytes:
-                    continue
-                with Image.open(io.BytesIO(image_bytes)) as pil_image:
-                    pil_image.load()
-                    if self.settings.skip_small_images and pil_image.width < 1000:
-                        continue
-                    pil_image = self._colorize(pil_image)
-                    target_width = max(1, int(page.rect.width / 72 * self.settings.dpi))
-                    target_height = max(1, int(page.rect.height / 72 * self.settings.dpi))
-                    pil_image = self._downscale(pil_image, target_width, target_height)
-                    buffer = io.BytesIO()
-                    pil_image.save(
-                        buffer,
-                        format="JPEG",
-                        quality=self.settings.jpeg_quality,
-                        optimize=True,
-                    )
-                    jpeg_bytes = buffer.getvalue()
+                extractor = self._raw_extractors.get(image_info[8])
+                base = extractor(doc, image_info) if extractor else None
+                if base is None:
+                    base = doc.extract_image(xref)
+            except Exception as exc:
+                self._log(f"Изображение пропущено (xref {xref}): {exc}")
+                continue
+            image_bytes = base.get("image")
+            if not image_bytes:
+                continue
+            if self._keeps_original(base, target_width, target_height):
+                continue
+            jobs.append((xref, image_bytes, base.get("ext"), target_width, target_height))
+        return jobs
+
+    def _decode_jpeg_scaled(self, image_bytes: bytes, target_width: int, target_height: int):
+        width, height, _, _ = _TJ.decode_header(image_bytes)
+        scaling_factor = (1, 1)
+        scaled_size = (width, height)
+        for num, denom in _TJ.scaling_factors:
+            if num >= denom:
+                continue
+            scaled_width = -(-width * num // denom)
+            scaled_height = -(-height * num // denom)
+            if target_width <= scaled_width < scaled_size[0] and target_height <= scaled_height:
+                scaling_factor = (num, denom)
+                scaled_size = (scaled_width, scaled_height)
+        if self.settings.color_mode == "Color":
+            array = _TJ.decode(image_bytes, pixel_format=TJPF_RGB, scaling_factor=scaling_factor)
+            return Image.fromarray(array, "RGB")
+        array = _TJ.decode(image_bytes, pixel_format=TJPF_GRAY, scaling_factor=scaling_factor)
+        return Image.fromarray(array[:, :, 0], "L")
+
+    def _decode_image(self, image_bytes: bytes, ext: str, target_width: int, target_height: int):
+        if _TJ is not None and ext in ("jpeg", "jpg"):
+            try:
+                return self._decode_jpeg_scaled(image_bytes, target_width, target_height)
+            except Exception:
+                pass
+        pil_image = Image.open(io.BytesIO(image_bytes))
+        pil_image.draft("RGB" if self.settings.color_mode == "Color" else "L", (target_width, target_height))
+        pil_image.load()
+        return pil_image
+
+    def _render_page_jpegs(self, jobs):
+        results = []
+        for xref, image_bytes, ext, target_width, target_height in jobs:
+            try:
+                pil_image = self._decode_image(image_bytes, ext, target_width, target_height)
+                pil_image = self._colorize(pil_image)
+                pil_image = self._downscale(pil_image, target_width, target_height)
+                if self._jpeg_encoder == "pymupdf":
+                    results.append((xref, pil_image))
+                else:
+                    results.append((xref, self._encode_jpeg(pil_image)))
+            except Exception as exc:
+                self._log(f"Изображение пропущено (xref {xref}): {exc}")
+        return results
+
+    def _apply_page_jpegs(self, doc: fitz.Document, page: fitz.Page, results):
+        for xref, encoded in results:
+            try:
+                jpeg_bytes = self._encode_pixmap(encoded) if self._jpeg_encoder == "pymupdf" else encoded
                 try:
                     page.replace_image(xref, stream=jpeg_bytes)
                 except Exception:
                     doc.update_stream(xref, jpeg_bytes)
             except Exception as exc:
                 self._log(f"Изображение пропущено (xref {xref}): {exc}")
-                continue
 
-    @QtCore.Slot()
-    def run(self):
-        total = len(self.files)
-        for index, file_path in enumerate(self.files):
-            if self._stop_event.is_set():
-                break
-            self.file_started.emit(index)
-            self._log(f"Открытие: {file_path}")
-            input_path = Path(file_path)
+    def _write_output(self, index: int, output_path: Path, pdf_bytes: bytes, before_size: int):
+        temp_name = None
+        try:
+            fd, temp_name = tempfile.mkstemp(suffix=".tmp", dir=output_path.parent)
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(pdf_bytes)
+            os.chmod(temp_name, 0o666 & ~_UMASK)
+            os.replace(temp_name, output_path)
+        except Exception as exc:
+            if temp_name is not None:
+                Path(temp_name).unlink(missing_ok=True)
+            self._log(f"Ошибка: {output_path} — {exc}")
+            self._emit("file_finished", index, "Error", 0, 0, "-")
+            return
+        after_size = len(pdf_bytes)
+        savings = 0
+        if before_size > 0:
+            savings = round((1 - after_size / before_size) * 100, 1)
+        self._log(f"Готово: {output_path}")
+        self._emit("file_finished", index, "Готово", before_size, after_size, f"{savings}%")
+
+    def compress(self, index: int, file_path: str):
+        if self._stop_event.is_set():
+            return None
+        self._emit("file_started", index)
+        self._log(f"Открытие: {file_path}")
+        input_path = Path(file_path)
+        try:
             output_path = self._determine_output_path(file_path)
-            try:
-                before_size = input_path.stat().st_size
-                with fitz.open(file_path) as doc:
-                    page_count = doc.page_count
-                    for page_index in range(page_count):
-                        if self._stop_event.is_set():
-                            break
-                        page = doc.load_page(page_index)
-                        self._process_page_images(doc, page)
-                        progress = int((page_index + 1) / page_count * 100) if page_count else 0
-                        self.progress_file.emit(progress)
+            if output_path.resolve() == input_path.resolve():
+                output_path = output_path.with_name(f"{input_path.stem}_compressed.pdf")
+                self._log(f"Выходной файл совпадает с исходным, сохранение в {output_path}")
+            pdf_bytes = input_path.read_bytes()
+            before_size = len(pdf_bytes)
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc, ThreadPoolExecutor(self._page_workers) as pool:
+                page_count = doc.page_count
+                batch_size = self._page_workers * 2
+                for batch_start in range(0, page_count, batch_size):
                     if self._stop_event.is_set():
-                        break
-                    doc.save(output_path)
-                after_size = output_path.stat().st_size
-                savings = 0
-                if before_size > 0:
-                    savings = round((1 - after_size / before_size) * 100, 1)
-                self.file_finished.emit(
-                    index,
-                    "Готово",
-                    before_size,
-                    after_size,
-                    f"{savings}%",
-                )
-                self._log(f"Готово: {output_path}")
-            except Exception as exc:
-                self.file_finished.emit(index, "Error", 0, 0, "-")
-                self._log(f"Ошибка: {file_path} — {exc}")
-            self.progress_overall.emit(int((index + 1) / total * 100))
+                        return self._stopped(index, file_path)
+                    batch_end = min(batch_start + batch_size, page_count)
+                    pages = [doc.load_page(page_index) for page_index in range(batch_start, batch_end)]
+                    jobs = [self._collect_page_images(doc, page) for page in pages]
+                    rendered = pool.map(self._render_page_jpegs, jobs)
+                    for page_index, page, results in zip(range(batch_start, batch_end), pages, rendered):
+                        self._apply_page_jpegs(doc, page, results)
+                        progress = int((page_index + 1) / page_count * 100)
+                        self._emit_progress(index, progress, force=page_index in (0, page_count - 1))
+                if self._stop_event.is_set():
+                    return self._stopped(index, file_path)
+                pdf_bytes = doc.tobytes(deflate=True, garbage=4, use_objstms=1)
+            write = functools.partial(self._write_output, index, output_path, pdf_bytes, before_size)
+            if self._write_queue is None:
+                write()
+            else:
+                self._write_queue.put((index, file_path, write))
+            return before_size, len(pdf_bytes), "Готово"
+        except Exception as exc:
+            self._emit("file_finished", index, "Error", 0, 0, "-")
+            self._log(f"Ошибка: {file_path} — {exc}")
+            return 0, 0, "Error"
+        finally:
+            self._flush_logs()
+
+
+class CompressionWorker(QtCore.QObject):
+    progress_overall = QtCore.Signal(int)
+    progress_file = QtCore.Signal(int)
+    log = QtCore.Signal(str)
+    file_started = QtCore.Signal(int)
+    file_finished = QtCore.Signal(int, str, int, int, str)
+    finished = QtCore.Signal()
+
+    def __init__(self, files, settings: CompressionSettings):
+        super().__init__()
+        self.files = list(files)
+        self.settings = settings
+        self._events = multiprocessing.Queue()
+        self._stop_event = multiprocessing.Event()
+        self._reported = set()
+        self._file_progress = {}
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _log(self, message):
+        timestamp = time.strftime("%H:%M:%S")
+        self.log.emit(f"[{timestamp}] {message}")
+
+    def _handle_event(self, signal, *args):
+        if signal == "file_progress":
+            index, progress = args
+            self._file_progress[index] = progress
+            self._emit_current_progress()
+            return
+        getattr(self, signal).emit(*args)
+        if signal == "file_started":
+            self._file_progress[args[0]] = 0
+            self._emit_current_progress()
+        elif signal == "file_finished":
+            self._file_progress.pop(args[0], None)
+            self._emit_current_progress()
+            self._reported.add(args[0])
+            self.progress_overall.emit(int(len(self._reported) / len(self.files) * 100))
+
+    def _emit_current_progress(self):
+        if self._file_progress:
+            self.progress_file.emit(self._file_progress[min(self._file_progress)])
+
+    def _drain_events(self):
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                return
+            self._handle_event(*event)
+
+    @QtCore.Slot()
+    def run(self):
+        jpeg_encoder = _resolve_jpeg_encoder(self.settings.jpeg_encoder)
+        if jpeg_encoder != self.settings.jpeg_encoder:
+            self._log(f"Кодировщик {self.settings.jpeg_encoder} недоступен, используется {jpeg_encoder}")
+        resize_backend = _resolve_resize_backend(self.settings.resize_backend)
+        if resize_backend != self.settings.resize_backend:
+            self._log(f"Масштабирование {self.settings.resize_backend} недоступно, используется {resize_backend}")
+        cpu_count = os.cpu_count() or 1
+        max_workers = max(1, min(len(self.files), cpu_count))
+        page_workers = max(1, cpu_count // max_workers)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_process,
+            initargs=(self._events, self._stop_event, page_workers),
+        ) as executor:
+            futures = {
+                executor.submit(_process_one_file, index, file_path, self.settings): index
+                for index, file_path in enumerate(self.files)
+            }
+            pending = set(futures)
+            writing = set()
+            while pending or writing - self._reported:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                self._drain_events()
+                for future in done:
+                    if future.cancelled():
+                        continue
+                    index = futures[future]
+                    exc = future.exception()
+                    if exc is None:
+                        if future.result() is not None:
+                            writing.add(index)
+                        continue
+                    self._handle_event("file_finished", index, "Error", 0, 0, "-")
+                    self._log(f"Ошибка: {self.files[index]} — {exc}")
+                    if isinstance(exc, BrokenProcessPool):
+                        for lost in writing - self._reported:
+                            self._handle_event("file_finished", lost, "Error", 0, 0, "-")
+                if self._stop_event.is_set():
+                    for future in pending:
+                        future.cancel()
+        self._drain_events()
         self.finished.emit()
 
 
+class FileSizeLoader(QtCore.QObject):
+    sizes_loaded = QtCore.Signal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=4)
+
+    def load(self, paths):
+        self._pool.submit(self._stat_all, paths)
+
+    def _stat_all(self, paths):
+        sizes = []
+        for path in paths:
+            try:
+                sizes.append((path, Path(path).stat().st_size))
+            except OSError:
+                sizes.append((path, None))
+        self.sizes_loaded.emit(sizes)
+
+
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
@@ -204,10 +644,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.worker_thread = None
         self.worker = None
         self.file_paths = []
+        self._rows = {}
 
         self.table = FileTable()
         self.table.files_dropped.connect(self.add_files)
 
+        self.size_loader = FileSizeLoader(self)
+        self.size_loader.sizes_loaded.connect(self._apply_sizes)
+
         self.log_output = QtWidgets.QTextEdit()
         self.log_output.setReadOnly(True)
 
@@ -248,6 +692,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.jpeg_spin = QtWidgets.QSpinBox()
         self.jpeg_spin.setRange(40, 95)
         self.jpeg_spin.setValue(75)
+        self.jpeg_encoder_combo = QtWidgets.QComboBox()
+        self.jpeg_encoder_combo.addItems(["pillow", "turbojpeg", "jpegli", "pymupdf"])
+        self.resize_backend_combo = QtWidgets.QComboBox()
+        self.resize_backend_combo.addItems(["pillow", "opencv"])
+        self.progressive_checkbox = QtWidgets.QCheckBox("Прогрессивный JPEG / оптимизированный Хаффман")
         self.skip_pages_checkbox = QtWidgets.QCheckBox("Пропускать страницы без картинок")
         self.skip_small_checkbox = QtWidgets.QCheckBox("Не трогать мелкие изображения (<1000px)")
 
@@ -256,6 +705,9 @@ class MainWindow(QtWidgets.QMainWindow):
         advanced_layout.addRow("DPI", self.dpi_spin)
         advanced_layout.addRow("Color mode", self.color_mode_combo)
         advanced_layout.addRow("JPEG quality", self.jpeg_spin)
+        advanced_layout.addRow("JPEG encoder", self.jpeg_encoder_combo)
+        advanced_layout.addRow("", self.progressive_checkbox)
+        advanced_layout.addRow("Resize backend", self.resize_backend_combo)
         advanced_layout.addRow("", self.skip_pages_checkbox)
         advanced_layout.addRow("", self.skip_small_checkbox)
 
@@ -328,16 +780,22 @@ class MainWindow(QtWidgets.QMainWindow):
             self.dpi_spin.setValue(150)
             self.color_mode_combo.setCurrentText("Grayscale")
             self.jpeg_spin.setValue(65)
+            self.jpeg_encoder_combo.setCurrentText("jpegli")
+            self.progressive_checkbox.setChecked(True)
             self.advanced_group.setEnabled(False)
         elif preset == "Balanced":
             self.dpi_spin.setValue(200)
             self.color_mode_combo.setCurrentText("Grayscale")
             self.jpeg_spin.setValue(75)
+            self.jpeg_encoder_combo.setCurrentText("turbojpeg")
+            self.progressive_checkbox.setChecked(False)
             self.advanced_group.setEnabled(False)
         elif preset == "High Quality":
             self.dpi_spin.setValue(300)
             self.color_mode_combo.setCurrentText("Color")
             self.jpeg_spin.setValue(85)
+            self.jpeg_encoder_combo.setCurrentText("turbojpeg")
+            self.progressive_checkbox.setChecked(False)
             self.advanced_group.setEnabled(False)
         else:
             self.advanced_group.setEnabled(True)
@@ -349,21 +807,38 @@ class MainWindow(QtWidgets.QMainWindow):
         QtGui.QGuiApplication.clipboard().setText(self.log_output.toPlainText())
 
     def add_files(self, paths):
+        new_paths = []
         for path in paths:
-            if path in self.file_paths:
+            if path in self._rows:
                 continue
             if not path.lower().endswith(".pdf"):
                 continue
-            self.file_paths.append(path)
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            name_item = QtWidgets.QTableWidgetItem(Path(path).name)
-            before_size = self._format_size(Path(path).stat().st_size)
-            self.table.setItem(row, 0, name_item)
-            self.table.setItem(row, 1, QtWidgets.QTableWidgetItem(before_size))
+            self._rows[path] = len(self.file_paths) + len(new_paths)
+            new_paths.append(path)
+        if not new_paths:
+            return
+        start = self.table.rowCount()
+        self.file_paths.extend(new_paths)
+        self.table.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        self.table.setRowCount(start + len(new_paths))
+        for row, path in enumerate(new_paths, start):
+            self.table.setItem(row, 0, QtWidgets.QTableWidgetItem(Path(path).name))
+            self.table.setItem(row, 1, QtWidgets.QTableWidgetItem("…"))
             self.table.setItem(row, 2, QtWidgets.QTableWidgetItem("Ожидание"))
             self.table.setItem(row, 3, QtWidgets.QTableWidgetItem("-"))
             self.table.setItem(row, 4, QtWidgets.QTableWidgetItem("-"))
+        self.table.blockSignals(False)
+        self.table.setUpdatesEnabled(True)
+        self.table.viewport().update()
+        self.size_loader.load(new_paths)
+
+    def _apply_sizes(self, sizes):
+        for path, size in sizes:
+            row = self._rows.get(path)
+            if row is not None:
+                text = "-" if size is None else self._format_size(size)
+                self.table.setItem(row, 1, QtWidgets.QTableWidgetItem(text))
 
     def select_files(self):
         paths, _ = QtWidgets.QFileDialog.getOpenFileNames(
@@ -379,9 +854,23 @@ class MainWindow(QtWidgets.QMainWindow):
         folder = QtWidgets.QFileDialog.getExistingDirectory(self, "Выбрать папку")
         if not folder:
             return
-        pdfs = [str(path) for path in Path(folder).glob("*.pdf")]
+        try:
+            with os.scandir(folder) as entries:
+                pdfs = [
+                    entry.path
+                    for entry in entries
+                    if entry.is_file(follow_symlinks=False) and entry.name.lower().endswith(".pdf")
+                ]
+        except OSError as exc:
+            self.log(f"Не удалось прочитать папку {folder}: {exc}")
+            return
         if pdfs:
-            self.add_files(pdfs)
+            self._add_files_in_batches(pdfs)
+
+    def _add_files_in_batches(self, paths, start=0, batch_size=500):
+        self.add_files(paths[start:start + batch_size])
+        if start + batch_size < len(paths):
+            QtCore.QTimer.singleShot(0, lambda: self._add_files_in_batches(paths, start + batch_size, batch_size))
 
     def select_output_folder(self):
         folder = QtWidgets.QFileDialog.getExistingDirectory(self, "Выходная папка")
@@ -393,10 +882,13 @@ class MainWindow(QtWidgets.QMainWindow):
         for row in rows:
             self.table.removeRow(row)
             self.file_paths.pop(row)
+        if rows:
+            self._rows = {path: row for row, path in enumerate(self.file_paths)}
 
     def clear_files(self):
         self.table.setRowCount(0)
         self.file_paths = []
+        self._rows.clear()
 
     def _format_size(self, size):
         for unit in ["B", "KB", "MB", "GB"]:
@@ -411,6 +903,9 @@ class MainWindow(QtWidgets.QMainWindow):
             dpi=self.dpi_spin.value(),
             color_mode=self.color_mode_combo.currentText(),
             jpeg_quality=self.jpeg_spin.value(),
+            jpeg_encoder=self.jpeg_encoder_combo.currentText(),
+            progressive_jpeg=self.progressive_checkbox.isChecked(),
+            resize_backend=self.resize_backend_combo.currentText(),
             skip_pages_without_images=self.skip_pages_checkbox.isChecked(),
             skip_small_images=self.skip_small_checkbox.isChecked(),
             output_dir=output_dir,
@@ -478,4 +973,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()